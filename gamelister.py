@@ -3,9 +3,14 @@
 # Name: gamelister.py
 # Desc: Interfaces with the IGDB.com API
 
+import copy
+import hashlib
 import json
 import logging
+import os
+import re
 import sys
+import unicodedata
 import datetime
 
 import pygsheets
@@ -17,12 +22,29 @@ from googleapiclient.errors import HttpError
 igdb_key_file = '.igdb_api_key'
 gsheet_json_file = '.gsheet.service.json'
 
+# Local cache files
+name_index_file = '.gamelister_names.jsonl'
+journal_file = '.gamelister_journal.jsonl'
+
 # Array of desired field names
 get_fields = ['id', 'name', 'total_rating', 'total_rating_count', 'category', 'genres', 'platforms', 'first_release_date']
 
 # Logger creation
 logger = logging.getLogger(__name__)
 
+
+class InvalidOptionsError(ValueError):
+    """
+    Raised when search options contain an unknown mode or status
+    """
+
+
+class NoGamesFoundError(Exception):
+    """
+    Raised when a search has no games to return or write
+    """
+
+
 genre_db = {
         2: 'Point-and-Click',
         4: 'Fighting',
@@ -219,10 +241,10 @@ nintendo_platforms = ['Nintendo', 'Super Nintendo',
                       'Game Boy Advance', 'Game Boy Color']
 
 
-def igdb_api_connect():
+def read_igdb_api_key():
     """
-    Establish a connection to the IGDB API
-    :return: active IGDB API connection object
+    Read the IGDB API key from its credential file
+    :return: API key
     """
 
     try:
@@ -230,7 +252,16 @@ def igdb_api_connect():
     except FileNotFoundError:
         sys.exit("API key file '{}' not found. Aborting.".format(igdb_key_file))
 
-    return igdb.igdb(api_file.read().splitlines()[0])
+    return api_file.read().splitlines()[0]
+
+
+def igdb_api_connect():
+    """
+    Establish a connection to the IGDB API
+    :return: active IGDB API connection object
+    """
+
+    return igdb.igdb(read_igdb_api_key())
 
 
 def open_sheet(sheet_title, sheet_name=None, return_as='worksheet'):
@@ -289,11 +320,416 @@ def readable_time(epoch_ms):
     return datetime.datetime.fromtimestamp(int(epoch_ms)).strftime('%B %d, %Y')
 
 
-def search_games(igdb_obj, options):
+def normalize_name(name):
+    """
+    Reduce a game name to a comparable form (case folded, no accents or punctuation, single spaces, no duplicate marker)
+    :param name: game name
+    :return: normalized name
+    """
+
+    name = unicodedata.normalize('NFKD', name).casefold()
+    name = ''.join(char for char in name if not '\u0300' <= char <= '\u036f')  # Drop accents, Pokémon matches Pokemon
+    name = unicodedata.normalize('NFC', name)                                   # Recompose marks like kana voicing
+
+    words = re.sub(r'[\W_]+', ' ', name).split()
+
+    if words and words[0] == 'duplicate':                               # IGDB marks duplicate entries with a prefix
+        words = words[1:]
+
+    return ' '.join(words)
+
+
+def name_trigrams(text, padded=True):
+    """
+    Split text into its set of character trigrams
+    :param text: text to split (expected to be lowercase already)
+    :param padded: if true, pad the text so that the start and end of the name form trigrams too
+    :return: set of trigrams
+    """
+
+    if padded:
+        text = '  {} '.format(text)
+
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def edit_distance(first, second, max_distance=None):
+    """
+    Levenshtein distance between two strings
+    :param first: first string
+    :param second: second string
+    :param max_distance: if set, stop early and return max_distance + 1 once it is exceeded
+    :return: number of single character edits between the strings
+    """
+
+    if max_distance is not None and abs(len(first) - len(second)) > max_distance:
+        return max_distance + 1
+
+    previous_row = list(range(len(second) + 1))
+
+    for i, first_char in enumerate(first, 1):
+        current_row = [i]
+
+        for j, second_char in enumerate(second, 1):
+            current_row.append(min(previous_row[j] + 1,                     # Deletion
+                                   current_row[j - 1] + 1,                  # Insertion
+                                   previous_row[j - 1] + (first_char != second_char)))     # Substitution
+
+        if max_distance is not None and min(current_row) > max_distance:
+            return max_distance + 1
+
+        previous_row = current_row
+
+    return previous_row[-1]
+
+
+def read_json_lines(file_path):
+    """
+    Read an append-only file of JSON records, cutting off a last line left unfinished by a crash
+    :param file_path: path of the file
+    :return: array of records (empty if the file does not exist)
+    """
+
+    try:
+        with open(file_path, "rb") as file_obj:
+            data = file_obj.read()
+    except FileNotFoundError:
+        return []
+
+    complete = data.rfind(b'\n') + 1
+
+    if complete < len(data):                                            # Later appends must start on a fresh line
+        logger.warning("Dropping unfinished last line of '{}'.".format(file_path))
+        with open(file_path, "r+b") as file_obj:
+            file_obj.truncate(complete)
+
+    records = []
+
+    for line in data[:complete].decode('utf-8').splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            logger.warning("Skipping unreadable line in '{}'.".format(file_path))
+
+    return records
+
+
+def new_name_index():
+    """
+    Create an empty game name index
+    :return: name index
+    """
+
+    return {'names': {}, 'normalized': {}, 'by_name': {}, 'trigrams': {}, 'unsaved': []}
+
+
+def load_name_index(index_file=name_index_file):
+    """
+    Load the local game name index from disk, or start an empty one
+    :param index_file: path of the index file (one JSON record per line, later records replace earlier ones)
+    :return: name index
+    """
+
+    name_index = new_name_index()
+
+    update_name_index(name_index, read_json_lines(index_file))
+
+    name_index['unsaved'] = []                                          # Everything loaded is already on disk
+
+    return name_index
+
+
+def save_name_index(name_index, index_file=name_index_file):
+    """
+    Append the games added or renamed since the last save to the name index file
+    :param name_index: name index to save
+    :param index_file: path of the index file
+    :return: 0
+    """
+
+    if not name_index['unsaved']:
+        return 0
+
+    with open(index_file, "at") as index_obj:
+        index_obj.write(''.join(json.dumps({'id': game_id, 'name': name}) + '\n' for game_id, name in name_index['unsaved']))
+
+    name_index['unsaved'] = []
+
+    return 0
+
+
+def update_name_index(name_index, games):
+    """
+    Add or refresh games in the local name index
+    :param name_index: name index to update
+    :param games: array of games (only 'id' and 'name' are used)
+    :return: number of games added or renamed
+    """
+
+    changed = 0
+
+    for game in games:
+
+        if 'id' not in game.keys() or 'name' not in game.keys():
+            continue
+
+        game_id = str(game['id'])
+        old_name = name_index['names'].get(game_id)
+
+        if old_name == game['name']:                                    # Already indexed, nothing to do
+            continue
+
+        if old_name is not None:                                        # Renamed, drop the old entries first
+            old_normalized = name_index['normalized'][game_id]
+
+            name_index['by_name'][old_normalized].discard(game_id)
+            if not name_index['by_name'][old_normalized]:
+                del name_index['by_name'][old_normalized]
+
+            for trigram in name_trigrams(old_normalized):
+                name_index['trigrams'][trigram].discard(game_id)
+                if not name_index['trigrams'][trigram]:
+                    del name_index['trigrams'][trigram]
+
+        normalized = normalize_name(game['name'])
+
+        name_index['names'][game_id] = game['name']
+        name_index['normalized'][game_id] = normalized
+        name_index['by_name'].setdefault(normalized, set()).add(game_id)
+
+        for trigram in name_trigrams(normalized):
+            name_index['trigrams'].setdefault(trigram, set()).add(game_id)
+
+        name_index['unsaved'].append((game_id, game['name']))
+
+        changed += 1
+
+    return changed
+
+
+def search_name_index(name_index, search, max_distance=None):
+    """
+    Find indexed games by title without calling the API (case and punctuation are ignored)
+    :param name_index: name index to search
+    :param search: text to look for
+    :param max_distance: if not set, match titles containing the search text, otherwise match whole titles within
+                         this many edits of the search text
+    :return: array of matched game IDs
+    """
+
+    search = normalize_name(search)
+    normalized = name_index['normalized']
+
+    if not search:                                                      # Nothing left to compare after normalizing
+        return []
+
+    if max_distance is None:
+        search_grams = name_trigrams(search, padded=False)
+
+        if not search_grams:                                            # Too short for trigrams, check every name
+            candidates = normalized.keys()
+        else:
+            candidates = set.intersection(*[name_index['trigrams'].get(trigram, set()) for trigram in search_grams])
+
+        return [game_id for game_id in candidates if search in normalized[game_id]]
+
+    if max_distance == 0:                                               # Exact title, no need to count trigrams
+        return list(name_index['by_name'].get(search, ()))
+
+    search_grams = name_trigrams(search)
+    required = len(search_grams) - 3 * max_distance                     # Each edit breaks at most three trigrams
+
+    if required <= 0:
+        candidates = normalized.keys()
+    else:
+        shared = {}
+        for trigram in search_grams:
+            for game_id in name_index['trigrams'].get(trigram, ()):
+                shared[game_id] = shared.get(game_id, 0) + 1
+        candidates = [game_id for game_id, count in shared.items() if count >= required]
+
+    return [game_id for game_id in candidates
+            if edit_distance(search, normalized[game_id], max_distance) <= max_distance]
+
+
+def find_duplicate_names(name_index, game_id, max_distance=0):
+    """
+    Find other indexed games whose titles are near duplicates of a given game
+    :param name_index: name index to search
+    :param game_id: ID of the game to check
+    :param max_distance: maximum edit distance between the normalized titles
+    :return: array of duplicate game IDs
+    """
+
+    game_id = str(game_id)
+
+    if game_id not in name_index['names'].keys():
+        return []
+
+    if not name_index['normalized'][game_id]:                         # Nothing left to compare after normalizing
+        return []
+
+    if max_distance == 0:
+        matches = name_index['by_name'].get(name_index['normalized'][game_id], ())
+    else:
+        matches = search_name_index(name_index, name_index['names'][game_id], max_distance)
+
+    return [match_id for match_id in matches if match_id != game_id]
+
+
+def payload_hash(payload):
+    """
+    Stable hash of a JSON-compatible payload
+    :param payload: data to hash
+    :return: SHA-1 hex digest
+    """
+
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def load_journal(data_sets, run_journal_file=journal_file):
+    """
+    Load the run journal left by an interrupted run, or start a new one
+    :param data_sets: array of data set options for this run (a journal from a different config is discarded)
+    :param run_journal_file: path of the journal file (one JSON record per line, the first one holds the config hash)
+    :return: run journal
+    """
+
+    config_hash = payload_hash(data_sets)
+
+    journal = {'file': run_journal_file, 'config': config_hash, 'queries': {}, 'sheets': {}}
+
+    records = read_json_lines(run_journal_file)
+
+    if records and records[0].get('config') == config_hash:
+
+        for record in records[1:]:
+            if 'sheet' in record.keys():
+                journal['sheets'][record['sheet']] = {key: record[key] for key in ('status', 'hash', 'title')}
+            elif 'offset' in record.keys():
+                journal['queries'][record['query']]['pages'][str(record['offset'])] = {'hash': record['hash'],
+                                                                                        'games': record['games']}
+            else:
+                journal['queries'][record['query']] = {'total': record['total'], 'pages': {}}
+
+        logger.info("Resuming run from journal '{}'.".format(run_journal_file))
+
+        return journal
+
+    if records:
+        logger.warning("Run journal '{}' is from a different config. Starting from scratch.".format(run_journal_file))
+
+    with open(run_journal_file, "wt") as journal_obj:
+        journal_obj.write(json.dumps({'config': config_hash}) + '\n')
+
+    return journal
+
+
+def append_journal(journal, record):
+    """
+    Commit a record to the end of the run journal file
+    :param journal: run journal
+    :param record: JSON-compatible record to append
+    :return: 0
+    """
+
+    with open(journal['file'], "at") as journal_obj:
+        journal_obj.write(json.dumps(record) + '\n')
+
+    return 0
+
+
+def clear_journal(journal):
+    """
+    Remove the run journal once a run has finished
+    :param journal: run journal to remove
+    :return: 0
+    """
+
+    try:
+        os.remove(journal['file'])
+    except FileNotFoundError:
+        pass
+
+    return 0
+
+
+def journal_page(journal, query_key, offset):
+    """
+    Return a page committed to the run journal
+    :param journal: run journal
+    :param query_key: hash identifying the query
+    :param offset: offset of the page
+    :return: array of games on the page, or None if the page has to be fetched
+    """
+
+    page = journal['queries'].get(query_key, {}).get('pages', {}).get(str(offset))
+
+    if page is None:
+        return None
+
+    if payload_hash(page['games']) != page['hash']:
+        logger.warning("Journaled page at offset {} is corrupt. Fetching it again.".format(offset))
+        return None
+
+    return copy.deepcopy(page['games'])                                 # Filtering reorders platforms in place
+
+
+def record_journal_query(journal, query_key, total):
+    """
+    Commit the total count of a query to the run journal
+    :param journal: run journal
+    :param query_key: hash identifying the query
+    :param total: number of games the query matched
+    :return: 0
+    """
+
+    journal['queries'][query_key] = {'total': total, 'pages': {}}
+
+    return append_journal(journal, {'query': query_key, 'total': total})
+
+
+def record_journal_page(journal, query_key, offset, games):
+    """
+    Commit a fetched page to the run journal
+    :param journal: run journal
+    :param query_key: hash identifying the query
+    :param offset: offset of the page
+    :param games: array of games on the page
+    :return: 0
+    """
+
+    games_hash = payload_hash(games)
+
+    journal['queries'][query_key]['pages'][str(offset)] = {'hash': games_hash, 'games': copy.deepcopy(games)}
+
+    return append_journal(journal, {'query': query_key, 'offset': offset, 'hash': games_hash, 'games': games})
+
+
+def record_journal_sheet(journal, run_count, status, games_hash, title):
+    """
+    Commit the state of a worksheet write to the run journal
+    :param journal: run journal
+    :param run_count: data set the worksheet belongs to
+    :param status: 'created' once the worksheet exists, 'done' once it is written, or 'empty' if there was nothing
+                   to write
+    :param games_hash: hash of the games being written
+    :param title: title of the worksheet being written
+    :return: 0
+    """
+
+    journal['sheets'][run_count] = {'status': status, 'hash': games_hash, 'title': title}
+
+    return append_journal(journal, {'sheet': run_count, 'status': status, 'hash': games_hash, 'title': title})
+
+
+def search_games(igdb_obj, options, name_index=None, journal=None):
     """
     Return an array of games for a given platform from the API
     :param igdb_obj: IGDB API connection
     :param options: array of options to search for and filter by
+    :param name_index: local name index to update (loaded from disk and saved again if not provided)
+    :param journal: run journal to resume pages from and commit fetched pages to
     :return: array of matched games
     """
 
@@ -303,8 +739,17 @@ def search_games(igdb_obj, options):
     time_now = (datetime.datetime.now().microsecond - (3600 * 6))
 
     all_matched_games = []
+    matched_ids = {}
     information = {}
 
+    save_index = name_index is None
+
+    if save_index:
+        name_index = load_name_index()
+
+    if 'search' in options.keys():
+        search_name = normalize_name(options['search'])
+
     for key in options.keys():
         information[key] = 0
 
@@ -324,7 +769,7 @@ def search_games(igdb_obj, options):
             elif options['search_platform_mode'] == 'all':
                 filters['[platforms][all]'] = platform_string
             else:
-                raise ValueError("Invalid platform search mode input.")
+                raise InvalidOptionsError("Invalid platform search mode input.")
         else:
             filters['[platforms][any]'] = platform_string
 
@@ -342,7 +787,7 @@ def search_games(igdb_obj, options):
             elif options['search_genre_mode'] == 'all':
                 filters['[genre][all]'] = genre_string
             else:
-                raise ValueError("Invalid genre search mode input.")
+                raise InvalidOptionsError("Invalid genre search mode input.")
         else:
             filters['[genres][any]'] = genre_string
 
@@ -353,20 +798,33 @@ def search_games(igdb_obj, options):
             filters['[first_released_date][gt]'] = time_now
         else:
             if options['release_status'] != 'ALL':
-                raise ValueError("Invalid release status input. Valid statuses: RELEASED, UNRELEASED, ALL.")
+                raise InvalidOptionsError("Invalid release status input. Valid statuses: RELEASED, UNRELEASED, ALL.")
     else:
         options['release_status'] = 'ALL'
 
-    try:
+    query_key = payload_hash({                                          # Ignore the time based filters, they change every run
+        'search': options.get('search'),
+        'filters': {key: value for key, value in filters.items() if 'first_released_date' not in key},
+        'release_status': options['release_status']
+    })
 
-        if 'search' in options.keys():
-            total = int(igdb_obj.games({'search': options['search'], 'filters': filters, 'scroll': 1}).headers['X-Count'])
-        else:
-            total = int(igdb_obj.games({'filters': filters, 'scroll': 1}).headers['X-Count'])
+    if journal is not None and query_key in journal['queries'].keys():
+        total = journal['queries'][query_key]['total']                  # Keep the pagination of the interrupted run
+
+    else:
+        try:
+
+            if 'search' in options.keys():
+                total = int(igdb_obj.games({'search': options['search'], 'filters': filters, 'scroll': 1}).headers['X-Count'])
+            else:
+                total = int(igdb_obj.games({'filters': filters, 'scroll': 1}).headers['X-Count'])
 
-    except KeyError:
+        except KeyError:
 
-        total = 0
+            total = 0
+
+        if journal is not None:
+            record_journal_query(journal, query_key, total)
 
     while offset < (total + 1) and offset < 10000:
 
@@ -376,23 +834,38 @@ def search_games(igdb_obj, options):
 
         logger.info("Scraping games {} - {} (of {})...".format(offset, offset + 49, total))
 
-        if 'search' in options.keys():
-            matched_games = igdb_obj.games({'search': options['search'], 'filters': filters, 'fields': get_fields, 'limit': limit, 'offset': offset}).json()
-        else:
-            matched_games = igdb_obj.games({'filters': filters, 'fields': get_fields, 'limit': limit, 'offset': offset}).json()
+        matched_games = None
+
+        if journal is not None:
+            matched_games = journal_page(journal, query_key, offset)
+
+        if matched_games is None:
+
+            if 'search' in options.keys():
+                matched_games = igdb_obj.games({'search': options['search'], 'filters': filters, 'fields': get_fields, 'limit': limit, 'offset': offset}).json()
+            else:
+                matched_games = igdb_obj.games({'filters': filters, 'fields': get_fields, 'limit': limit, 'offset': offset}).json()
+
+            if journal is not None and len(matched_games) > 0:
+                record_journal_page(journal, query_key, offset, matched_games)
 
         if len(matched_games) == 0:
-            sys.exit("No games found! Filter dump: {}".format(json.dumps(filters, indent=4)))
+            raise NoGamesFoundError("No games found! Filter dump: {}".format(json.dumps(filters, indent=4)))
+
+        update_name_index(name_index, matched_games)
 
         for game in matched_games:
 
             disallowed = False
 
-            if 'error' in game.keys() or 'name' not in game.keys():                         # Malformed or missing game
+            if 'error' in game.keys() or 'id' not in game.keys() or 'name' not in game.keys():    # Malformed or missing game
                 continue
 
             if 'search' in options.keys():
-                if options['search'] not in game['name']:
+                if search_name:
+                    if search_name not in name_index['normalized'][str(game['id'])]:
+                        continue
+                elif options['search'] not in game['name']:                             # Nothing to normalize, match as typed
                     continue
 
             if 'category' in game.keys():
@@ -400,7 +873,13 @@ def search_games(igdb_obj, options):
                     disallowed = True
 
             if game['name'].startswith('duplicate'):                                        # Skip duplicates
-                    disallowed = True
+                disallowed = True
+
+            for duplicate_id in find_duplicate_names(name_index, game['id']):                # Skip unmarked duplicates
+                if duplicate_id in matched_ids.keys():
+                    release_dates = [matched_ids[duplicate_id].get('first_release_date'), game.get('first_release_date')]
+                    if None in release_dates or release_dates[0] == release_dates[1]:           # Remakes keep their own date
+                        disallowed = True
 
             if 'allowed_platforms' in options.keys():
                 if 'platforms' not in game.keys():
@@ -463,21 +942,26 @@ def search_games(igdb_obj, options):
 
             if not disallowed:
                 all_matched_games.append(game)
+                matched_ids[str(game['id'])] = game
 
         offset += 50
 
+    if save_index:
+        save_name_index(name_index)
+
     options['information'] = information
 
     return all_matched_games
 
 
-def write_game_sheet(sheet_api, games, options, new_sheet=False):
+def write_game_sheet(sheet_api, games, options, new_sheet=False, journal=None):
     """
     Build a game matrix and write it to a worksheet
     :param sheet_api: worksheet to work on
     :param games: array of games to write
     :param options: array of options to add to the sheet info
     :param new_sheet: if true, write to a new worksheet
+    :param journal: run journal used to skip finished writes and reuse the worksheet of an interrupted one
     :return: 0
     """
 
@@ -494,7 +978,7 @@ def write_game_sheet(sheet_api, games, options, new_sheet=False):
     information_range = 'B3:D9'
 
     if len(games) == 0:
-        sys.exit("No games found.")
+        raise NoGamesFoundError("No games found.")
 
     else:
         print("Writing {} games to worksheet...".format(len(games)))
@@ -506,18 +990,40 @@ def write_game_sheet(sheet_api, games, options, new_sheet=False):
     else:
         title = backup_title
 
-    try:
-        if new_sheet:
-            base_worksheet = sheet_api.worksheet_by_title('Template')
-            worksheet = sheet_api.add_worksheet(title, src_worksheet=base_worksheet, index=-1)
-        else:
-            worksheet = sheet_api.worksheet_by_title(title)
-    except HttpError:
-        if new_sheet:
-            base_worksheet = sheet_api.worksheet_by_title('Template')
-            worksheet = sheet_api.add_worksheet(backup_title, src_worksheet=base_worksheet, index=-1)
-        else:
-            worksheet = sheet_api.worksheet_by_title(backup_title)
+    games_hash = payload_hash(games)
+    sheet_entry = None
+
+    if journal is not None:
+        sheet_entry = journal['sheets'].get(options['run_count'])
+
+        if sheet_entry is not None and sheet_entry['status'] == 'done' and sheet_entry['hash'] == games_hash:
+            logger.info("Worksheet '{}' was already written. Skipping.".format(sheet_entry['title']))
+            return 0
+
+    worksheet = None
+
+    if sheet_entry is not None and sheet_entry['status'] in ('created', 'done'):    # Only reuse a worksheet this run made
+        try:
+            worksheet = sheet_api.worksheet_by_title(sheet_entry['title'])
+        except pygsheets.WorksheetNotFound:
+            logger.warning("Journaled worksheet '{}' is gone. Creating it again.".format(sheet_entry['title']))
+
+    if worksheet is None:
+        try:
+            if new_sheet:
+                base_worksheet = sheet_api.worksheet_by_title('Template')
+                worksheet = sheet_api.add_worksheet(title, src_worksheet=base_worksheet, index=-1)
+            else:
+                worksheet = sheet_api.worksheet_by_title(title)
+        except (HttpError, pygsheets.WorksheetNotFound):
+            if new_sheet:
+                base_worksheet = sheet_api.worksheet_by_title('Template')
+                worksheet = sheet_api.add_worksheet(backup_title, src_worksheet=base_worksheet, index=-1)
+            else:
+                worksheet = sheet_api.worksheet_by_title(backup_title)
+
+        if journal is not None:
+            record_journal_sheet(journal, options['run_count'], 'created', games_hash, worksheet.title)
 
     if len(games) > worksheet.rows + data_start_row:
         worksheet.rows = data_start_row + len(games)
@@ -650,6 +1156,9 @@ def write_game_sheet(sheet_api, games, options, new_sheet=False):
 
     worksheet.update_cells(crange=cell_range, values=game_matrix)
 
+    if journal is not None:
+        record_journal_sheet(journal, options['run_count'], 'done', games_hash, worksheet.title)
+
     return 0
 
 
@@ -705,14 +1214,28 @@ def main():
 
     ]
 
+    journal = load_journal(data_sets)
+    name_index = load_name_index()
+
     run_count = 1
 
     for options in data_sets:
         options['run_count'] = str(run_count)
-        found_games = search_games(db, options)
-        write_game_sheet(sheet, found_games, options, new_sheet=True)
         run_count += 1
 
+        if journal['sheets'].get(options['run_count'], {}).get('status') == 'empty':
+            continue
+
+        try:
+            found_games = search_games(db, options, name_index, journal)
+            save_name_index(name_index)
+            write_game_sheet(sheet, found_games, options, new_sheet=True, journal=journal)
+        except NoGamesFoundError as error:                              # Keep going with the other data sets
+            print("Skipping data set {}: {}".format(options['run_count'], error))
+            record_journal_sheet(journal, options['run_count'], 'empty', None, None)
+
+    clear_journal(journal)
+
     sys.exit()
 
 
@@ -0,0 +1,401 @@
+#!/usr/bin/env python
+
+# Name: gamelister_service.py
+# Desc: Serves gamelister searches over a local HTTP/JSON API
+
+import asyncio
+import collections
+import concurrent.futures
+import json
+import logging
+import threading
+import time
+
+import requests
+
+from igdb_api_python import igdb
+
+import gamelister
+
+# Service settings
+service_host = '127.0.0.1'
+service_port = 8650
+cache_size = 256            # Number of query results kept in memory
+cache_ttl = 600             # Seconds before a cached result is fetched again
+latency_samples = 1000      # Number of recent requests used for the latency percentiles
+
+# Logger creation
+logger = logging.getLogger(__name__)
+
+http_reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class NoGamesFound(Exception):
+    """
+    Raised when a search matches no games
+    """
+
+
+class InvalidSearch(Exception):
+    """
+    Raised when a search has invalid options
+    """
+
+
+class SessionIGDB(igdb.igdb):
+    """
+    IGDB client that sends every request through one keep-alive HTTP session
+    """
+
+    def __init__(self, api_key, api_url=None):
+        super().__init__(api_key)
+
+        self.session = requests.Session()
+
+        if api_url is not None:
+            self._igdb__api_url = api_url
+
+    def getRequest(self, url):
+        r = self.session.get(self._igdb__api_url + url,
+                             headers={'user-key': self._igdb__api_key, 'Accept': 'application/json'})
+        r.body = json.loads(r.text)
+        return r
+
+
+def create_service(api_key=None, api_url=None, name_index=None):
+    """
+    Build the state shared by every request to the service
+    :param api_key: IGDB API key (read from the local API key file if not provided)
+    :param api_url: IGDB API base URL (the client's default if not provided)
+    :param name_index: local name index to add fetched names to (loaded from disk if not provided)
+    :return: service state
+    """
+
+    if api_key is None:
+        api_key = gamelister.read_igdb_api_key()
+
+    if name_index is None:
+        name_index = gamelister.load_name_index()
+
+    return {
+        'api_key': api_key,
+        'api_url': api_url,
+        'clients': threading.local(),                       # The IGDB client keeps each request on the instance
+        'sessions': [],
+        'sessions_lock': threading.Lock(),
+        'name_index': name_index,
+        'name_index_lock': threading.Lock(),
+        'executor': concurrent.futures.ThreadPoolExecutor(),
+        'cache': collections.OrderedDict(),
+        'in_flight': {},
+        'latencies': collections.deque(maxlen=latency_samples),
+        'counts': {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'upstream': 0, 'errors': 0}
+    }
+
+
+def percentile(samples, percent):
+    """
+    Nearest-rank percentile of a set of samples
+    :param samples: array of numbers
+    :param percent: percentile to return (0 - 100)
+    :return: percentile value, or 0 if there are no samples
+    """
+
+    if not samples:
+        return 0
+
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * percent // 100))        # Ceiling without floats
+
+    return ordered[int(rank) - 1]
+
+
+def service_stats(service):
+    """
+    Summarize the request counts and latency of the service
+    :param service: service state
+    :return: dictionary of statistics
+    """
+
+    stats = dict(service['counts'])
+
+    stats['cached_queries'] = len(service['cache'])
+    stats['in_flight'] = len(service['in_flight'])
+    stats['p50_ms'] = round(percentile(service['latencies'], 50) * 1000, 3)
+    stats['p99_ms'] = round(percentile(service['latencies'], 99) * 1000, 3)
+
+    return stats
+
+
+def cache_get(service, query_key):
+    """
+    Return a cached query result if it has not expired
+    :param service: service state
+    :param query_key: hash identifying the query
+    :return: cached result, or None
+    """
+
+    entry = service['cache'].get(query_key)
+
+    if entry is None:
+        return None
+
+    if entry['expires'] < time.monotonic():
+        del service['cache'][query_key]
+        return None
+
+    service['cache'].move_to_end(query_key)                 # Most recently used goes to the back
+
+    return entry['result']
+
+
+def cache_put(service, query_key, result):
+    """
+    Store a query result, evicting the least recently used results over the cache size
+    :param service: service state
+    :param query_key: hash identifying the query
+    :param result: result to store
+    :return: 0
+    """
+
+    service['cache'][query_key] = {'expires': time.monotonic() + cache_ttl, 'result': result}
+    service['cache'].move_to_end(query_key)
+
+    while len(service['cache']) > cache_size:
+        service['cache'].popitem(last=False)
+
+    return 0
+
+
+def igdb_client(service):
+    """
+    Return the IGDB client of the calling worker thread, creating it on first use
+    :param service: service state
+    :return: IGDB API connection with a warm HTTP session
+    """
+
+    client = getattr(service['clients'], 'igdb', None)
+
+    if client is None:
+        client = SessionIGDB(service['api_key'], service['api_url'])
+        service['clients'].igdb = client
+
+        with service['sessions_lock']:
+            service['sessions'].append(client.session)
+
+    return client
+
+
+def run_search(service, options):
+    """
+    Run a blocking search_games call for the service
+    :param service: service state
+    :param options: array of options to search for and filter by
+    :return: dictionary of matched games and filter information
+    """
+
+    options = dict(options)                                 # search_games adds its own keys to the options
+    search_index = gamelister.new_name_index()              # Searches run in parallel, so each gets its own index
+
+    try:
+        games = gamelister.search_games(igdb_client(service), options, search_index)
+    except gamelister.InvalidOptionsError as error:
+        raise InvalidSearch(str(error))
+    except gamelister.NoGamesFoundError as error:
+        raise NoGamesFound(str(error))
+
+    with service['name_index_lock']:                        # Only names new to the service get appended to disk
+        gamelister.update_name_index(service['name_index'],
+                                     [{'id': game_id, 'name': name} for game_id, name in search_index['names'].items()])
+        gamelister.save_name_index(service['name_index'])
+
+    return {'games': games, 'information': options['information']}
+
+
+async def search(service, options):
+    """
+    Answer a search from the cache, from an identical search already running, or from the API
+    :param service: service state
+    :param options: array of options to search for and filter by
+    :return: dictionary of matched games and filter information
+    """
+
+    query_key = gamelister.payload_hash(options)
+
+    result = cache_get(service, query_key)
+
+    if result is not None:
+        service['counts']['cache_hits'] += 1
+        return result
+
+    task = service['in_flight'].get(query_key)
+
+    if task is not None:
+        service['counts']['coalesced'] += 1
+    else:
+        service['counts']['upstream'] += 1
+        loop = asyncio.get_running_loop()
+        task = asyncio.ensure_future(loop.run_in_executor(service['executor'], run_search, service, options))
+        service['in_flight'][query_key] = task
+
+        def finish(done_task):
+            del service['in_flight'][query_key]
+            if not done_task.cancelled() and done_task.exception() is None:
+                cache_put(service, query_key, done_task.result())
+
+        task.add_done_callback(finish)
+
+    return await asyncio.shield(task)                       # A caller hanging up must not cancel the shared fetch
+
+
+async def read_request(reader):
+    """
+    Read an HTTP request from a client
+    :param reader: stream to read from
+    :return: method, path and body of the request
+    """
+
+    request_line = (await reader.readline()).decode('latin-1').split()
+
+    if len(request_line) < 2:
+        raise ValueError("Malformed request line.")
+
+    headers = {}
+
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    body = b''
+
+    if 'content-length' in headers.keys():
+        body = await reader.readexactly(int(headers['content-length']))
+
+    return request_line[0].upper(), request_line[1], body
+
+
+async def handle_request(service, method, path, body):
+    """
+    Route a request to the service
+    :param service: service state
+    :param method: HTTP method
+    :param path: request path
+    :param body: request body
+    :return: HTTP status and JSON-compatible response
+    """
+
+    if path == '/stats':
+        if method != 'GET':
+            return 405, {'error': 'Use GET for /stats.'}
+        return 200, service_stats(service)
+
+    if path == '/search':
+        if method != 'POST':
+            return 405, {'error': 'Use POST for /search.'}
+
+        try:
+            options = json.loads(body.decode('utf-8') or '{}')
+        except ValueError:
+            return 400, {'error': 'Request body is not valid JSON.'}
+
+        if not isinstance(options, dict):
+            return 400, {'error': 'Request body must be a JSON object of search options.'}
+
+        try:
+            return 200, await search(service, options)
+        except InvalidSearch as error:
+            return 400, {'error': str(error)}
+        except NoGamesFound as error:
+            return 404, {'error': str(error)}
+
+    return 404, {'error': "Unknown path '{}'.".format(path)}
+
+
+async def handle_client(service, reader, writer):
+    """
+    Serve a single HTTP/JSON request
+    :param service: service state
+    :param reader: client stream to read from
+    :param writer: client stream to write to
+    :return: null
+    """
+
+    started = time.perf_counter()
+    service['counts']['requests'] += 1
+
+    try:
+        method, path, body = await read_request(reader)
+    except (ValueError, asyncio.IncompleteReadError) as error:
+        status, response = 400, {'error': str(error)}
+    else:
+        try:
+            status, response = await handle_request(service, method, path, body)
+        except Exception as error:
+            logger.exception("Request failed.")
+            status, response = 500, {'error': str(error)}
+
+    if status >= 500:
+        service['counts']['errors'] += 1
+
+    payload = json.dumps(response).encode('utf-8')
+
+    writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: close\r\n\r\n'
+                 .format(status, http_reasons.get(status, ''), len(payload)).encode('latin-1') + payload)
+
+    try:
+        await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+    service['latencies'].append(time.perf_counter() - started)
+
+
+async def start_service(service, host=service_host, port=service_port):
+    """
+    Start listening for HTTP/JSON requests
+    :param service: service state
+    :param host: address to listen on
+    :param port: port to listen on (0 picks a free port)
+    :return: running asyncio server
+    """
+
+    server = await asyncio.start_server(lambda reader, writer: handle_client(service, reader, writer), host, port)
+
+    logger.info("Serving gamelister on {}:{}".format(*server.sockets[0].getsockname()[:2]))
+
+    return server
+
+
+async def main():
+    """
+    Run the service until interrupted
+    :return: null
+    """
+
+    service = create_service()
+    server = await start_service(service)
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service['executor'].shutdown(wait=True)             # Let running searches finish adding their names
+        gamelister.save_name_index(service['name_index'])
+
+        for session in service['sessions']:
+            session.close()
+
+
+if __name__ == '__main__':
+
+    logging.basicConfig(level=logging.INFO, format='%(name)s %(message)s')
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,313 @@
+# Name: test_gamelister.py
+# Desc: Tests for the name index and run journal in gamelister.py
+
+import json
+import types
+
+import pygsheets
+import pytest
+
+from googleapiclient.errors import HttpError
+
+import gamelister
+
+
+class FakeResponse:
+    """
+    Stands in for the requests response returned by the IGDB client
+    """
+
+    def __init__(self, games, headers=None):
+        self.games = games
+        self.headers = headers or {}
+
+    def json(self):
+        return self.games
+
+
+class FakeIGDB:
+    """
+    Returns a fixed list of games, 50 at a time, for any query
+    """
+
+    def __init__(self, games):
+        self.all_games = games
+        self.calls = 0
+
+    def games(self, args):
+        self.calls += 1
+        if 'scroll' in args.keys():
+            return FakeResponse([], {'X-Count': str(len(self.all_games) - 1)})
+        return FakeResponse([dict(game) for game in self.all_games[args['offset']:args['offset'] + 50]])
+
+
+class FakeWorksheet:
+    """
+    Records what write_game_sheet writes to a worksheet
+    """
+
+    def __init__(self, spreadsheet, title):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.rows = 100
+        self.cells = {}
+        self.writes = 0
+
+    def cell(self, address):
+        return self.cells.setdefault(address, types.SimpleNamespace(value=''))
+
+    def get_values(self, start, end, returnas=None):
+        return types.SimpleNamespace(apply_format=lambda model: None)
+
+    def update_cells(self, crange, values):
+        if self.spreadsheet.write_failures:
+            self.spreadsheet.write_failures -= 1
+            raise ConnectionError("Lost connection to the spreadsheet.")
+        self.writes += 1
+
+
+class FakeSpreadsheet:
+    """
+    Holds worksheets by title and can fail a number of worksheet additions or writes
+    """
+
+    def __init__(self, *titles):
+        self.worksheets = {title: FakeWorksheet(self, title) for title in ('Template',) + titles}
+        self.add_failures = 0
+        self.write_failures = 0
+
+    def worksheet_by_title(self, title):
+        if title not in self.worksheets.keys():
+            raise pygsheets.WorksheetNotFound()
+        return self.worksheets[title]
+
+    def add_worksheet(self, title, src_worksheet=None, index=None):
+        if self.add_failures:
+            self.add_failures -= 1
+            raise ConnectionError("Lost connection to the spreadsheet.")
+        if title in self.worksheets.keys():
+            raise HttpError(types.SimpleNamespace(status=400, reason='Sheet exists'), b'')
+        self.worksheets[title] = FakeWorksheet(self, title)
+        return self.worksheets[title]
+
+
+def build_index(names):
+    name_index = gamelister.new_name_index()
+    gamelister.update_name_index(name_index, [{'id': game_id, 'name': name} for game_id, name in names.items()])
+    return name_index
+
+
+@pytest.fixture
+def name_index():
+    return build_index({1: 'Final Fantasy VII', 2: 'Final Fantasy: X', 3: 'Pokémon Red', 4: 'Doom',
+                        5: 'duplicate Final Fantasy VII', 6: 'ファイナルファンタジー', 7: 'ドラゴンクエスト'})
+
+
+@pytest.fixture(autouse=True)
+def index_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)                                 # search_games saves the index it loads
+    return str(tmp_path / 'names.jsonl')
+
+
+def test_normalize_name():
+    assert gamelister.normalize_name('Final Fantasy: X') == 'final fantasy x'
+    assert gamelister.normalize_name('duplicate Zelda') == 'zelda'
+    assert gamelister.normalize_name('POKÉMON Red') == 'pokemon red'
+    assert gamelister.normalize_name('ドラゴンクエスト') == 'ドラゴンクエスト'
+    assert gamelister.normalize_name('!!!') == ''
+
+
+def test_edit_distance():
+    assert gamelister.edit_distance('kitten', 'sitting') == 3
+    assert gamelister.edit_distance('kitten', 'sitting', max_distance=1) == 2
+    assert gamelister.edit_distance('doom', 'doom ii', max_distance=2) == 3        # Length alone rules it out
+
+
+def test_substring_search(name_index):
+    assert sorted(gamelister.search_name_index(name_index, 'fantasy')) == ['1', '2', '5']
+    assert gamelister.search_name_index(name_index, 'final fantasy x') == ['2']
+    assert gamelister.search_name_index(name_index, 'pokemon') == ['3']
+    assert gamelister.search_name_index(name_index, 'do') == ['4']                # Shorter than a trigram
+    assert gamelister.search_name_index(name_index, 'ファンタジー') == ['6']
+    assert gamelister.search_name_index(name_index, '!!!') == []
+
+
+def test_fuzzy_search(name_index):
+    assert sorted(gamelister.search_name_index(name_index, 'Fnal Fantsy VII', 2)) == ['1', '5']
+    assert gamelister.search_name_index(name_index, 'Fnal Fantsy VII', 1) == []
+    assert gamelister.search_name_index(name_index, 'dom', 1) == ['4']             # Falls back to a full scan
+
+
+def test_exact_search_and_duplicates(name_index):
+    assert sorted(gamelister.search_name_index(name_index, 'final fantasy vii', 0)) == ['1', '5']
+    assert gamelister.find_duplicate_names(name_index, 1) == ['5']
+    assert gamelister.find_duplicate_names(name_index, 6) == []
+    assert gamelister.find_duplicate_names(name_index, 99) == []
+
+
+def test_empty_names_are_never_duplicates():
+    name_index = build_index({1: '!!!', 2: '???'})
+
+    assert gamelister.find_duplicate_names(name_index, 1) == []
+
+
+def test_rename_and_reload(name_index, index_file):
+    gamelister.save_name_index(name_index, index_file)
+    gamelister.update_name_index(name_index, [{'id': 4, 'name': 'Doom Eternal'}])
+    gamelister.save_name_index(name_index, index_file)
+
+    reloaded = gamelister.load_name_index(index_file)
+
+    assert reloaded['names']['4'] == 'Doom Eternal'                                # Later records win
+    assert gamelister.search_name_index(reloaded, 'eternal') == ['4']
+    assert gamelister.search_name_index(reloaded, 'doom', 0) == []                 # Old name is gone
+    assert reloaded['unsaved'] == []
+
+
+def test_truncated_last_line(name_index, index_file):
+    gamelister.save_name_index(name_index, index_file)
+
+    with open(index_file, "at") as index_obj:
+        index_obj.write('{"id": "8", "na')
+
+    reloaded = gamelister.load_name_index(index_file)
+
+    assert len(reloaded['names']) == 7
+
+    gamelister.update_name_index(reloaded, [{'id': 9, 'name': 'Metroid'}])
+    gamelister.save_name_index(reloaded, index_file)
+
+    assert gamelister.load_name_index(index_file)['names']['9'] == 'Metroid'
+
+
+def test_search_games_drops_marked_duplicates():
+    games = [{'id': 1, 'name': 'duplicate Zelda'}, {'id': 2, 'name': 'Zelda', 'first_release_date': 1},
+             {'id': 3, 'name': 'Zelda II', 'category': 1}, {'id': 4, 'name': 'duplicate Zelda II'}]
+
+    found = gamelister.search_games(FakeIGDB(games), {}, gamelister.new_name_index())
+
+    assert [game['name'] for game in found] == ['Zelda']
+
+
+def test_search_games_drops_unmarked_duplicates_but_keeps_remakes():
+    games = [{'id': 1, 'name': 'Doom', 'first_release_date': 1}, {'id': 2, 'name': 'DOOM', 'first_release_date': 1},
+             {'id': 3, 'name': 'Doom', 'first_release_date': 2}, {'id': 4, 'name': 'ファイナルファンタジー'},
+             {'id': 5, 'name': 'ドラゴンクエスト'}]
+
+    found = gamelister.search_games(FakeIGDB(games), {}, gamelister.new_name_index())
+
+    assert [game['id'] for game in found] == [1, 3, 4, 5]
+
+
+def test_search_games_matches_normalized_names():
+    games = [{'id': 1, 'name': 'Pokémon Red'}, {'id': 2, 'name': 'Pokemon Snap'}, {'id': 3, 'name': 'Doom'}]
+
+    found = gamelister.search_games(FakeIGDB(games), {'search': 'POKEMON'}, gamelister.new_name_index())
+
+    assert [game['id'] for game in found] == [1, 2]
+
+
+fake_games = [{'id': 1, 'name': 'The Legend of Zelda', 'platforms': [19], 'genres': [12]},
+              {'id': 2, 'name': 'Super Metroid', 'platforms': [19], 'genres': [8]}]
+
+data_sets = [{'title': 'Zelda'}]
+
+
+def run_data_set(igdb_obj, spreadsheet, journal_path):
+    journal = gamelister.load_journal(data_sets, journal_path)
+    options = dict(data_sets[0], run_count='1')
+
+    found_games = gamelister.search_games(igdb_obj, options, gamelister.new_name_index(), journal)
+    gamelister.write_game_sheet(spreadsheet, found_games, options, new_sheet=True, journal=journal)
+
+    return journal
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return str(tmp_path / 'journal.jsonl')
+
+
+def test_rerun_after_crashed_sheet_write(journal_path):
+    igdb_obj = FakeIGDB(fake_games)
+    spreadsheet = FakeSpreadsheet()
+    spreadsheet.write_failures = 1
+
+    with pytest.raises(ConnectionError):
+        run_data_set(igdb_obj, spreadsheet, journal_path)
+
+    calls = igdb_obj.calls
+    journal = run_data_set(igdb_obj, spreadsheet, journal_path)
+
+    assert igdb_obj.calls == calls                                              # Pages come from the journal
+    assert sorted(spreadsheet.worksheets) == ['Template', 'Zelda']
+    assert spreadsheet.worksheets['Zelda'].writes == 2
+    assert journal['sheets']['1']['status'] == 'done'
+
+
+def test_rerun_never_overwrites_an_older_worksheet(journal_path):
+    igdb_obj = FakeIGDB(fake_games)
+    spreadsheet = FakeSpreadsheet('Zelda')                                     # Left behind by an earlier run
+    spreadsheet.add_failures = 1
+
+    with pytest.raises(ConnectionError):
+        run_data_set(igdb_obj, spreadsheet, journal_path)
+
+    run_data_set(igdb_obj, spreadsheet, journal_path)
+
+    assert spreadsheet.worksheets['Zelda'].writes == 0
+    assert spreadsheet.worksheets['Data Set 1'].writes == 2
+
+
+def test_finished_sheet_is_skipped(journal_path):
+    igdb_obj = FakeIGDB(fake_games)
+    spreadsheet = FakeSpreadsheet()
+
+    run_data_set(igdb_obj, spreadsheet, journal_path)
+    run_data_set(igdb_obj, spreadsheet, journal_path)
+
+    assert igdb_obj.calls == 2
+    assert spreadsheet.worksheets['Zelda'].writes == 2                         # Information and games, once
+
+
+def test_changed_config_discards_journal(journal_path):
+    run_data_set(FakeIGDB(fake_games), FakeSpreadsheet(), journal_path)
+
+    journal = gamelister.load_journal([{'title': 'Metroid'}], journal_path)
+
+    assert journal['queries'] == {}
+    assert journal['sheets'] == {}
+    assert gamelister.read_json_lines(journal_path) == [{'config': journal['config']}]
+
+
+def test_corrupt_page_is_fetched_again(journal_path):
+    run_data_set(FakeIGDB(fake_games), FakeSpreadsheet(), journal_path)
+
+    records = gamelister.read_json_lines(journal_path)
+    for record in records:
+        if 'offset' in record.keys():
+            record['games'][0]['name'] = 'Tampered'
+
+    with open(journal_path, "wt") as journal_obj:
+        journal_obj.write(''.join(json.dumps(record) + '\n' for record in records))
+
+    igdb_obj = FakeIGDB(fake_games)
+    journal = gamelister.load_journal(data_sets, journal_path)
+    found_games = gamelister.search_games(igdb_obj, dict(data_sets[0]), gamelister.new_name_index(), journal)
+
+    assert igdb_obj.calls == 1                                                  # Only the page, the total is journaled
+    assert found_games[0]['name'] == 'The Legend of Zelda'
+
+
+def test_main_skips_empty_data_sets_and_clears_journal(monkeypatch):
+    spreadsheet = FakeSpreadsheet()
+
+    monkeypatch.setattr(gamelister, 'open_sheet', lambda title: spreadsheet)
+    monkeypatch.setattr(gamelister, 'igdb_api_connect', lambda: FakeIGDB(fake_games))
+
+    with pytest.raises(SystemExit):
+        gamelister.main()
+
+    assert 'SNES Generation Exclusives' in spreadsheet.worksheets.keys()
+    assert 'Final Fantasy' not in spreadsheet.worksheets.keys()                 # No names match, skipped
+    assert gamelister.read_json_lines(gamelister.journal_file) == []
@@ -0,0 +1,225 @@
+# Name: test_gamelister_service.py
+# Desc: End-to-end tests for gamelister_service.py against a fake IGDB server
+
+import asyncio
+import http.server
+import json
+import threading
+import time
+import urllib.parse
+
+import pytest
+
+import gamelister
+import gamelister_service
+
+fake_games = {
+    'zelda': [{'id': 1, 'name': 'The Legend of Zelda', 'platforms': [18]},
+              {'id': 2, 'name': 'Zelda II: The Adventure of Link', 'platforms': [18]}],
+    'mario': [{'id': 3, 'name': 'Super Mario Bros.', 'platforms': [18]}],
+    'metroid': [{'id': 4, 'name': 'Metroid', 'platforms': [18]}]
+}
+
+
+class FakeIGDBHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answers IGDB game searches from fake_games, counting connections and one upstream fetch per total count request
+    """
+
+    protocol_version = 'HTTP/1.1'                               # Allow keep-alive connections
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        search = query.get('search', [''])[0]
+        games = fake_games.get(search, [])
+
+        time.sleep(self.server.delay)                           # Keep searches in flight long enough to overlap
+
+        if search == 'broken':                                  # Upstream failure with a body that is not JSON
+            self.send_response(500)
+            self.send_header('Content-Length', '14')
+            self.end_headers()
+            self.wfile.write(b'Internal error')
+            return
+
+        if 'scroll' in query.keys():
+            self.server.fetches += 1
+            body, headers = [], {'X-Count': str(max(len(games) - 1, 0))}
+        else:
+            body, headers = games, {}
+
+        payload = json.dumps(body).encode('utf-8')
+
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_igdb():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), FakeIGDBHandler)
+    server.fetches = 0
+    server.connections = 0
+    server.delay = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def service(fake_igdb, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)                                 # Keep the name index file out of the repo
+
+    api_url = 'http://127.0.0.1:{}/'.format(fake_igdb.server_address[1])
+
+    service = gamelister_service.create_service('test-key', api_url, gamelister.new_name_index())
+
+    yield service
+
+    service['executor'].shutdown(wait=True)
+
+    for session in service['sessions']:
+        session.close()
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+
+    payload = b'' if body is None else json.dumps(body).encode('utf-8')
+
+    writer.write('{} {} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {}\r\n\r\n'
+                 .format(method, path, len(payload)).encode('latin-1') + payload)
+    await writer.drain()
+
+    response = await reader.read()
+    writer.close()
+
+    head, _, response_body = response.partition(b'\r\n\r\n')
+
+    return int(head.split()[1]), json.loads(response_body)
+
+
+def run_against_service(service, scenario):
+    async def runner():
+        server = await gamelister_service.start_service(service, port=0)
+        try:
+            return await scenario(server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    return asyncio.run(runner())
+
+
+def test_concurrent_identical_searches_share_one_fetch(service, fake_igdb):
+    fake_igdb.delay = 0.1
+
+    async def scenario(port):
+        return await asyncio.gather(*[request(port, 'POST', '/search', {'search': 'zelda'}) for _ in range(5)])
+
+    responses = run_against_service(service, scenario)
+
+    assert [status for status, _ in responses] == [200] * 5
+    assert all(len(body['games']) == 2 for _, body in responses)
+    assert fake_igdb.fetches == 1
+    assert service['counts']['coalesced'] == 4
+
+
+def test_concurrent_different_searches_get_their_own_games(service, fake_igdb):
+    fake_igdb.delay = 0.1
+
+    async def scenario(port):
+        return await asyncio.gather(request(port, 'POST', '/search', {'search': 'zelda'}),
+                                    request(port, 'POST', '/search', {'search': 'mario'}))
+
+    (zelda_status, zelda), (mario_status, mario) = run_against_service(service, scenario)
+
+    assert zelda_status == mario_status == 200
+    assert [game['id'] for game in zelda['games']] == [1, 2]
+    assert [game['id'] for game in mario['games']] == [3]
+    assert len(service['sessions']) == 2                                        # One client per worker thread
+
+
+def test_search_reuses_its_upstream_connection(service, fake_igdb):
+    async def scenario(port):
+        return await request(port, 'POST', '/search', {'search': 'zelda'})
+
+    status, _ = run_against_service(service, scenario)
+
+    assert status == 200
+    assert fake_igdb.connections == 1                                           # Count and page share a connection
+
+
+def test_repeated_search_is_served_from_cache(service, fake_igdb):
+    async def scenario(port):
+        await request(port, 'POST', '/search', {'search': 'zelda'})
+        return await request(port, 'POST', '/search', {'search': 'zelda'})
+
+    status, body = run_against_service(service, scenario)
+
+    assert status == 200
+    assert len(body['games']) == 2
+    assert fake_igdb.fetches == 1
+    assert service['counts']['cache_hits'] == 1
+
+
+def test_expired_search_is_fetched_again(service, fake_igdb, monkeypatch):
+    monkeypatch.setattr(gamelister_service, 'cache_ttl', 0)
+
+    async def scenario(port):
+        await request(port, 'POST', '/search', {'search': 'zelda'})
+        time.sleep(0.01)
+        return await request(port, 'POST', '/search', {'search': 'zelda'})
+
+    status, _ = run_against_service(service, scenario)
+
+    assert status == 200
+    assert fake_igdb.fetches == 2
+    assert service['counts']['cache_hits'] == 0
+
+
+def test_least_recently_used_search_is_evicted(service, fake_igdb, monkeypatch):
+    monkeypatch.setattr(gamelister_service, 'cache_size', 2)
+
+    async def scenario(port):
+        for search in ['zelda', 'mario', 'zelda', 'metroid', 'zelda', 'mario']:
+            await request(port, 'POST', '/search', {'search': search})
+
+    run_against_service(service, scenario)
+
+    # zelda, mario and metroid are fetched once, then mario again after metroid evicted it
+    assert fake_igdb.fetches == 4
+    assert service['counts']['cache_hits'] == 2
+
+
+def test_error_statuses(service, fake_igdb):
+    async def scenario(port):
+        return [
+            await request(port, 'POST', '/search', {'search': 'zelda', 'release_status': 'SOON'}),
+            await request(port, 'POST', '/search', {'search': 'nothing'}),
+            await request(port, 'POST', '/search', {'search': 'broken'}),
+            await request(port, 'POST', '/search', ['zelda']),
+            await request(port, 'GET', '/search'),
+            await request(port, 'GET', '/unknown'),
+            await request(port, 'GET', '/stats')
+        ]
+
+    responses = run_against_service(service, scenario)
+
+    assert [status for status, _ in responses] == [400, 404, 500, 400, 405, 404, 200]
+    assert responses[-1][1]['errors'] == 1
+    assert responses[-1][1]['p99_ms'] >= responses[-1][1]['p50_ms'] > 0